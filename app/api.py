@@ -1,10 +1,12 @@
 import os
+import time
+import hashlib
 from datetime import datetime, timezone
 from typing import List, Any
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from pydantic import BaseModel
-import motor.motor_asyncio
+from pymongo import AsyncMongoClient
 from fastapi.middleware.cors import CORSMiddleware
 
 MONGO_URI = os.getenv("MONGO_URI") or os.getenv("MONGODB_URI") or "mongodb://localhost:27017"
@@ -12,7 +14,8 @@ MONGO_DB = os.getenv("MONGO_DB") or os.getenv("MONGODB_DB") or "analytics"
 
 app = FastAPI(title="ELT Analytics API")
 
-client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
+# native asyncio driver (no thread pool hop per operation); keep a few connections warm
+client = AsyncMongoClient(MONGO_URI, maxPoolSize=50, minPoolSize=5)
 db = client[MONGO_DB]
 
 # Allow Streamlit dashboard (and others) to call this API from the browser if needed
@@ -24,6 +27,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Collection names rarely change, so cache them instead of asking MongoDB on every request
+COLLECTIONS_TTL_SECONDS = 30.0
+_collections_cache: tuple[float, set[str]] = (0.0, set())
+
+
+async def _known_collections(refresh: bool = False) -> set[str]:
+    global _collections_cache
+    ts, names = _collections_cache
+    if refresh or time.monotonic() - ts > COLLECTIONS_TTL_SECONDS:
+        names = set(await db.list_collection_names())
+        _collections_cache = (time.monotonic(), names)
+    return names
+
+
+def _is_hidden(name: str) -> bool:
+    # internal collections, and staging collections of an ingest in progress (half-written)
+    return name.startswith("system.") or name.endswith("__stage")
+
+
+async def _ensure_collection(name: str) -> None:
+    if _is_hidden(name):
+        raise HTTPException(status_code=404, detail="Collection not found")
+    if name in await _known_collections():
+        return
+    # the collection may have been created since the last refresh
+    if name not in await _known_collections(refresh=True):
+        raise HTTPException(status_code=404, detail="Collection not found")
+
+
+def _projection(fields: str | None) -> dict:
+    # `_id` is left out unless explicitly requested in `fields`
+    projection = {"_id": 0}
+    if fields:
+        projection.update({f.strip(): 1 for f in fields.split(",") if f.strip()})
+    return projection
+
 
 class RefreshInfo(BaseModel):
     collection: str
@@ -36,18 +75,17 @@ class RefreshInfo(BaseModel):
 @app.get("/collections")
 async def list_collections() -> List[str]:
     cols = await db.list_collection_names()
-    # filter out internal collections
-    return [c for c in cols if not c.startswith("system.")]
+    return [c for c in cols if not _is_hidden(c)]
 
 
 @app.get("/collections/{name}")
-async def get_collection(name: str, limit: int = 100):
-    if name not in await db.list_collection_names():
-        raise HTTPException(status_code=404, detail="Collection not found")
-    cursor = db[name].find().limit(limit)
+async def get_collection(name: str, limit: int = 100, fields: str | None = None):
+    await _ensure_collection(name)
+    cursor = db[name].find({}, _projection(fields)).limit(limit)
     docs = []
     async for d in cursor:
-        d["_id"] = str(d.get("_id"))
+        if "_id" in d:
+            d["_id"] = str(d["_id"])
         docs.append(d)
     return docs
 
@@ -59,10 +97,10 @@ async def get_collection_items(
     skip: int = 0,
     filter_field: str | None = None,
     filter_value: str | None = None,
+    fields: str | None = None,
 ):
     """Return items from a collection with optional simple equality filter, pagination supported."""
-    if name not in await db.list_collection_names():
-        raise HTTPException(status_code=404, detail="Collection not found")
+    await _ensure_collection(name)
 
     query = {}
     if filter_field and filter_value is not None:
@@ -78,27 +116,38 @@ async def get_collection_items(
             v = filter_value
         query[filter_field] = v
 
-    cursor = db[name].find(query).skip(skip).limit(limit)
+    cursor = db[name].find(query, _projection(fields)).skip(skip).limit(limit)
     docs = []
     async for d in cursor:
-        d["_id"] = str(d.get("_id"))
+        if "_id" in d:
+            d["_id"] = str(d["_id"])
         docs.append(d)
     return {"count": len(docs), "items": docs}
 
 
 @app.get("/collections/{name}/count")
 async def count_collection(name: str):
-    if name not in await db.list_collection_names():
-        raise HTTPException(status_code=404, detail="Collection not found")
-    cnt = await db[name].count_documents({})
+    # metadata-only count; a missing collection also reports 0, so only check existence then
+    cnt = await db[name].estimated_document_count()
+    if cnt == 0 or _is_hidden(name):
+        await _ensure_collection(name)
     return {"collection": name, "count": cnt}
 
 
-@app.get("/metadata/{collection}")
-async def get_metadata(collection: str):
+# Metadata only changes once per ingest: keep the parsed document for a few seconds
+METADATA_TTL_SECONDS = 10.0
+_metadata_cache: dict[str, tuple[float, tuple]] = {}
+
+
+async def _parsed_metadata(collection: str, refresh: bool = False) -> tuple | None:
+    """Return (source_last_modified, ingest_time, parsed source dt, parsed ingest dt) for a collection."""
+    cached = _metadata_cache.get(collection)
+    if cached and not refresh and time.monotonic() - cached[0] <= METADATA_TTL_SECONDS:
+        return cached[1]
+
     meta = await db["ingest_metadata"].find_one({"collection": collection})
     if not meta:
-        raise HTTPException(status_code=404, detail="Metadata not found")
+        return None
 
     source_lm = meta.get("source_info", {}).get("last_modified")
     ingest_time = meta.get("ingest_time")
@@ -116,10 +165,7 @@ async def get_metadata(collection: str):
 
     src_dt = _to_dt(source_lm)
     ing_dt = _to_dt(ingest_time)
-    now = datetime.now(timezone.utc)
 
-    delta_src_ing = None
-    delta_ing_now = None
     # normalize naive datetimes to UTC for arithmetic
     if src_dt and src_dt.tzinfo is None:
         try:
@@ -132,6 +178,29 @@ async def get_metadata(collection: str):
         except Exception:
             pass
 
+    entry = (source_lm, ingest_time, src_dt, ing_dt)
+    _metadata_cache[collection] = (time.monotonic(), entry)
+    return entry
+
+
+@app.get("/metadata/{collection}")
+async def get_metadata(collection: str, request: Request, response: Response):
+    # "Cache-Control: no-cache" skips (and refreshes) the TTL cache, e.g. right after an ingest
+    no_cache = "no-cache" in request.headers.get("cache-control", "")
+    entry = await _parsed_metadata(collection, refresh=no_cache)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Metadata not found")
+    source_lm, ingest_time, src_dt, ing_dt = entry
+
+    # the ETag only covers what changes per ingest (the ingest->now delta is derivable client side)
+    etag = '"%s"' % hashlib.sha1(f"{collection}|{source_lm}|{ingest_time}".encode()).hexdigest()[:16]
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    now = datetime.now(timezone.utc)
+    delta_src_ing = None
+    delta_ing_now = None
     if src_dt and ing_dt:
         delta_src_ing = (ing_dt - src_dt).total_seconds()
     if ing_dt:
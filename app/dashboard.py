@@ -5,9 +5,12 @@ import os
 import subprocess
 import sys
 import os
+import asyncio
+import atexit
 from io import BytesIO
 from typing import List
 
+import httpx
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -29,48 +32,90 @@ st.set_page_config(
 API_URL = os.environ.get("API_URL", "http://localhost:8000")
 
 
-@st.cache_data(ttl=300)
-def load_from_gold(object_name: str) -> pd.DataFrame:
-    """Charge un tableau depuis l'API (collection Mongo). Accepte `name` ou `name.csv`."""
-    import httpx
+@st.cache_resource
+def get_http_client() -> httpx.Client:
+    """Client HTTP partagé entre les reruns Streamlit (connexions keep-alive réutilisées)."""
+    client = httpx.Client(
+        base_url=API_URL,
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+    )
+    atexit.register(client.close)
+    return client
 
+
+async def _fetch_gold(client: httpx.AsyncClient, object_name: str) -> pd.DataFrame:
+    """Charge un tableau depuis l'API (collection Mongo). Accepte `name` ou `name.csv`."""
     try:
         coll = object_name
         if coll.endswith('.csv'):
             coll = coll[:-4]
-        url = f"{API_URL}/collections/{coll}"
-        with httpx.Client(timeout=10) as client:
-            r = client.get(url)
-            if r.status_code != 200:
-                return pd.DataFrame()
-            data = r.json()
-            if not data:
-                return pd.DataFrame()
-            df = pd.DataFrame.from_records(data)
-            # remove _id if present
-            if '_id' in df.columns:
-                df = df.drop(columns=['_id'])
-            return df
+        r = await client.get(f"/collections/{coll}")
+        if r.status_code != 200:
+            return pd.DataFrame()
+        data = r.json()
+        if not data:
+            return pd.DataFrame()
+        df = pd.DataFrame.from_records(data)
+        # remove _id if present
+        if '_id' in df.columns:
+            df = df.drop(columns=['_id'])
+        return df
     except Exception:
         return pd.DataFrame()
 
 
+async def _fetch_all_gold(object_names: tuple) -> list:
+    async with httpx.AsyncClient(base_url=API_URL, timeout=10.0) as client:
+        return await asyncio.gather(*(_fetch_gold(client, name) for name in object_names))
+
+
+@st.cache_data(ttl=300)
+def load_from_gold(object_names: tuple, ingest_time: str = "") -> list:
+    """Charge plusieurs tableaux gold en parallèle (une requête API par collection).
+
+    `ingest_time` ne sert qu'à la clé de cache : une nouvelle ingestion invalide le cache.
+    """
+    return asyncio.run(_fetch_all_gold(object_names))
+
+
+@st.cache_data(ttl=30)
 def get_refresh_info(object_name: str) -> dict:
-    import httpx
     try:
         coll = object_name
         if coll.endswith('.csv'):
             coll = coll[:-4]
-        url = f"{API_URL}/metadata/{coll}"
-        with httpx.Client(timeout=5) as client:
-            r = client.get(url)
-            if r.status_code != 200:
-                return {}
-            return r.json()
+        r = get_http_client().get(f"/metadata/{coll}", timeout=5)
+        if r.status_code != 200:
+            return {}
+        return r.json()
     except Exception:
         return {}
 
 
+# formats produced by the gold flows, keyed by string length
+_DATE_FORMATS = {10: '%Y-%m-%d', 7: '%Y-%m'}
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Convertit une colonne de dates en datetime, avec un format explicite quand il est reconnu."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    sample = values.dropna()
+    fmt = _DATE_FORMATS.get(len(str(sample.iloc[0]))) if not sample.empty else None
+    if fmt is None:
+        return pd.to_datetime(values, errors='coerce')
+    return pd.to_datetime(values, format=fmt, errors='coerce', cache=True)
+
+
+def parse_date_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Parse une seule fois les colonnes de dates (`date*`, `mois*`) d'un tableau chargé."""
+    for c in df.columns:
+        if 'date' in c.lower() or 'mois' in c.lower():
+            df[c] = parse_dates(df[c])
+    return df
+
+
 def safe_sum(df: pd.DataFrame, col: str) -> float:
     if df is None or df.empty or col not in df.columns:
         return 0.0
@@ -81,15 +126,19 @@ def main():
     st.title("📊 Dashboard ELT Pipeline")
     st.markdown("---")
 
+    # refresh metadata (via API)
+    monthly_meta = get_refresh_info("monthly_revenue.csv")
+
     with st.spinner("Chargement des données depuis MinIO (bucket gold)..."):
         # fichiers produits par les flows gold du projet
-        monthly_rev = load_from_gold("monthly_revenue.csv")
-        volumes_day = load_from_gold("volumes_day.csv")
-        volumes_month = load_from_gold("volumes_month.csv")
-        ca_by_country = load_from_gold("ca_by_country.csv")
+        monthly_rev, volumes_day, volumes_month, ca_by_country = load_from_gold(
+            ("monthly_revenue.csv", "volumes_day.csv", "volumes_month.csv", "ca_by_country.csv"),
+            monthly_meta.get("ingest_time") or "",
+        )
+        monthly_rev, volumes_day, volumes_month, ca_by_country = (
+            parse_date_columns(df) for df in (monthly_rev, volumes_day, volumes_month, ca_by_country)
+        )
 
-    # refresh metadata (via API)
-    monthly_meta = get_refresh_info("monthly_revenue.csv")
     # monthly_meta keys: delta_source_to_ingest_seconds, delta_ingest_to_now_seconds
     refresh_delta = None
     ingest_age = None
@@ -114,7 +163,7 @@ def main():
         date_cols = [c for c in rev.columns if "date" in c.lower() or "mois" in c.lower()]
         if not rev.empty and date_cols:
             col = date_cols[0]
-            rev[col] = pd.to_datetime(rev[col], errors="coerce")
+            rev[col] = parse_dates(rev[col])
             rev = rev.sort_values(col)
             val_col = "ca_total" if "ca_total" in rev.columns else ("montant" if "montant" in rev.columns else None)
             if val_col:
@@ -182,7 +231,7 @@ def main():
         df = volumes_day.copy()
         date_col = [c for c in df.columns if 'date' in c.lower()]
         if date_col:
-            df[date_col[0]] = pd.to_datetime(df[date_col[0]], errors='coerce')
+            df[date_col[0]] = parse_dates(df[date_col[0]])
             df = df.sort_values(date_col[0])
             val_col = next((c for c in ['volume','nb_achats','count'] if c in df.columns), None)
             if val_col:
@@ -194,7 +243,7 @@ def main():
         date_col = [c for c in df.columns if 'date' in c.lower() or 'mois' in c.lower()]
         if date_col:
             col = date_col[0]
-            df[col] = pd.to_datetime(df[col], errors='coerce')
+            df[col] = parse_dates(df[col])
             df = df.sort_values(col)
             val_col = 'ca_total' if 'ca_total' in df.columns else ('montant' if 'montant' in df.columns else None)
             if val_col:
@@ -254,9 +303,9 @@ def main():
 
     # SECTION 5: DONNÉES BRUTES
     with st.expander('📋 Voir les données brutes'):
-        tabs = st.tabs(['monthly_revenue', 'volumes_day', 'volumes_month', 'ca_by_country'])
-        for tname, df in zip(['monthly_revenue', 'volumes_day', 'volumes_month', 'ca_by_country'], [monthly_rev, volumes_day, volumes_month, ca_by_country]):
-            tab = tabs[['monthly_revenue', 'volumes_day', 'volumes_month', 'ca_by_country'].index(tname)]
+        tnames = ['monthly_revenue', 'volumes_day', 'volumes_month', 'ca_by_country']
+        tabs = st.tabs(tnames)
+        for tab, tname, df in zip(tabs, tnames, [monthly_rev, volumes_day, volumes_month, ca_by_country]):
             with tab:
                 if df is None or df.empty:
                     st.write(f'Aucun fichier `{tname}.csv` chargé')
@@ -273,50 +322,68 @@ def show_advanced_visuals(monthly_rev, volumes_day, ca_by_country):
 
     # --- cumulative revenue + moving average
     if not monthly_rev.empty and ('ca_total' in monthly_rev.columns or 'montant' in monthly_rev.columns):
-        df = monthly_rev.copy()
         # normalize date and value column
-        date_col = next((c for c in df.columns if 'date' in c.lower() or 'mois' in c.lower()), None)
-        value_col = 'ca_total' if 'ca_total' in df.columns else ('montant' if 'montant' in df.columns else None)
+        date_col = next((c for c in monthly_rev.columns if 'date' in c.lower() or 'mois' in c.lower()), None)
+        value_col = 'ca_total' if 'ca_total' in monthly_rev.columns else ('montant' if 'montant' in monthly_rev.columns else None)
         if date_col and value_col:
-            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-            df = df.sort_values(date_col)
-            df['cumulative'] = df[value_col].cumsum()
-            df['ma_3'] = df[value_col].rolling(3, min_periods=1).mean()
-
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=df[date_col], y=df['cumulative'], mode='lines', name='CA cumulé'))
-            fig.add_trace(go.Scatter(x=df[date_col], y=df['ma_3'], mode='lines', name='Moyenne mobile (3)', line=dict(dash='dash')))
-            fig.update_layout(title='CA cumulé et Moyenne mobile', yaxis_title='CA (€)')
+            fig = build_cumulative_chart(monthly_rev[[date_col, value_col]], date_col, value_col)
             st.plotly_chart(fig, use_container_width=True)
 
     # --- Pareto: top countries contribution
     if not ca_by_country.empty:
-        df = ca_by_country.copy()
-        val_col = next((c for c in ['ca_total','montant','ca'] if c in df.columns), None)
-        country_col = next((c for c in ['pays','country','country_name'] if c in df.columns), None)
+        val_col = next((c for c in ['ca_total','montant','ca'] if c in ca_by_country.columns), None)
+        country_col = next((c for c in ['pays','country','country_name'] if c in ca_by_country.columns), None)
         if val_col and country_col:
-            p = df[[country_col, val_col]].dropna()
-            p = p.sort_values(val_col, ascending=False)
-            p['cumperc'] = p[val_col].cumsum() / p[val_col].sum() * 100
-            fig = make_pareto_chart(p, country_col, val_col)
+            fig = build_pareto_chart(ca_by_country[[country_col, val_col]], country_col, val_col)
             st.plotly_chart(fig, use_container_width=True)
 
     # --- weekly heatmap from volumes_day
     if not volumes_day.empty:
-        df = volumes_day.copy()
-        date_col = next((c for c in df.columns if 'date' in c.lower()), None)
-        val_col = next((c for c in ['volume','nb_achats','count'] if c in df.columns), None)
+        date_col = next((c for c in volumes_day.columns if 'date' in c.lower()), None)
+        val_col = next((c for c in ['volume','nb_achats','count'] if c in volumes_day.columns), None)
         if date_col and val_col:
-            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-            df = df.dropna(subset=[date_col])
-            df['dow'] = df[date_col].dt.day_name()
-            df['week'] = df[date_col].dt.isocalendar().week
-            pivot = df.pivot_table(index='dow', columns='week', values=val_col, aggfunc='sum').reindex(['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday'])
-            fig = px.imshow(pivot, aspect='auto', color_continuous_scale='Blues', labels=dict(x='Semaine', y='Jour', color=val_col))
-            fig.update_layout(title='Heatmap hebdomadaire des volumes')
+            fig = build_weekly_heatmap(volumes_day[[date_col, val_col]], date_col, val_col)
             st.plotly_chart(fig, use_container_width=True)
 
 
+# Chart builders are cached on their (minimal) input slice, so widget-triggered reruns
+# reuse the figures instead of rebuilding them.
+@st.cache_data(ttl=300)
+def build_cumulative_chart(df: pd.DataFrame, date_col: str, value_col: str) -> go.Figure:
+    df = df.copy()
+    df[date_col] = parse_dates(df[date_col])
+    df = df.sort_values(date_col)
+    df['cumulative'] = df[value_col].cumsum()
+    df['ma_3'] = df[value_col].rolling(3, min_periods=1).mean()
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=df[date_col], y=df['cumulative'], mode='lines', name='CA cumulé'))
+    fig.add_trace(go.Scatter(x=df[date_col], y=df['ma_3'], mode='lines', name='Moyenne mobile (3)', line=dict(dash='dash')))
+    fig.update_layout(title='CA cumulé et Moyenne mobile', yaxis_title='CA (€)')
+    return fig
+
+
+@st.cache_data(ttl=300)
+def build_pareto_chart(df: pd.DataFrame, country_col: str, val_col: str) -> go.Figure:
+    p = df.dropna()
+    p = p.sort_values(val_col, ascending=False)
+    p['cumperc'] = p[val_col].cumsum() / p[val_col].sum() * 100
+    return make_pareto_chart(p, country_col, val_col)
+
+
+@st.cache_data(ttl=300)
+def build_weekly_heatmap(df: pd.DataFrame, date_col: str, val_col: str) -> go.Figure:
+    df = df.copy()
+    df[date_col] = parse_dates(df[date_col])
+    df = df.dropna(subset=[date_col])
+    df['dow'] = df[date_col].dt.day_name()
+    df['week'] = df[date_col].dt.isocalendar().week
+    pivot = df.pivot_table(index='dow', columns='week', values=val_col, aggfunc='sum').reindex(['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday'])
+    fig = px.imshow(pivot, aspect='auto', color_continuous_scale='Blues', labels=dict(x='Semaine', y='Jour', color=val_col))
+    fig.update_layout(title='Heatmap hebdomadaire des volumes')
+    return fig
+
+
 def make_pareto_chart(df, country_col, val_col):
     # df expected sorted desc
     fig = go.Figure()
@@ -2,55 +2,94 @@ from io import BytesIO
 from datetime import datetime
 
 import pandas as pd
+import polars as pl
 
 from prefect import flow
 from .config import BUCKET_SILVER, BUCKET_GOLD, get_minio_client
 
 
-def read_csv_from_bucket(client, bucket: str, object_name: str) -> pd.DataFrame:
+def read_frame_from_bucket(client, bucket: str, object_name: str) -> pl.DataFrame:
     resp = client.get_object(bucket, object_name)
-    data = resp.read()
-    resp.close()
-    resp.release_conn()
-    return pd.read_csv(BytesIO(data))
+    try:
+        if object_name.lower().endswith(".parquet"):
+            # parquet needs random access to its footer, so buffer the body
+            return pl.read_parquet(BytesIO(resp.read()))
+        return pl.read_csv(resp, try_parse_dates=True)
+    finally:
+        resp.close()
+        resp.release_conn()
 
 
 def upload_df_to_bucket(client, df: pd.DataFrame, bucket: str, object_name: str) -> None:
     out = BytesIO()
-    df.to_csv(out, index=False)
+    if object_name.lower().endswith(".parquet"):
+        df.to_parquet(out, engine="pyarrow", compression="zstd", index=False)
+    else:
+        df.to_csv(out, index=False)
     out.seek(0)
     client.put_object(bucket, object_name, out, length=out.getbuffer().nbytes)
     print(f"Uploaded {object_name} to {bucket}")
 
 
-def compute_kpis(clients: pd.DataFrame, achats: pd.DataFrame) -> dict:
-    # Ensure date column is datetime
-    if "date_achat" in achats.columns:
-        achats["date_achat"] = pd.to_datetime(achats["date_achat"], errors="coerce")
+def compute_kpis(clients: pl.LazyFrame | pl.DataFrame, achats: pl.LazyFrame | pl.DataFrame) -> dict:
+    """Compute the gold KPI tables as one lazy Polars query plan.
 
-    # Volumes per period
-    achats["day"] = achats["date_achat"].dt.date
-    achats["month"] = achats["date_achat"].dt.to_period("M").astype(str)
-    achats["week"] = achats["date_achat"].dt.to_period("W").astype(str)
+    The results are small, so they are handed back as pandas DataFrames for the upload step.
+    """
+    achats = achats.lazy()
+    clients = clients.lazy()
+
+    # Ensure date column is datetime
+    if achats.collect_schema()["date_achat"] == pl.String:
+        achats = achats.with_columns(pl.col("date_achat").str.to_datetime(strict=False))
 
-    volumes_day = achats.groupby("day").size().reset_index(name="volume")
-    volumes_month = achats.groupby("month").size().reset_index(name="volume")
+    facts = achats.select(
+        pl.col("date_achat").dt.strftime("%Y-%m-%d").alias("day"),
+        pl.col("date_achat").dt.strftime("%Y-%m").alias("month"),
+        pl.col("id_client").cast(pl.Int64),
+        pl.col("montant"),
+    )
 
     # CA par pays: join clients
-    joined = achats.merge(clients, left_on="id_client", right_on="id_client", how="left")
-    ca_by_country = joined.groupby("pays")["montant"].sum().reset_index().rename(columns={"montant": "ca"})
+    countries = clients.select(pl.col("id_client").cast(pl.Int64), "pays").unique("id_client", keep="first")
+    joined = facts.join(countries, on="id_client", how="left")
+
+    # One aggregation over the facts for both volumes and CA, marginals are derived from it
+    by_month_country = joined.group_by(["month", "pays"]).agg(
+        pl.col("montant").sum().alias("ca"),
+        pl.len().alias("volume"),
+    )
+    by_month = by_month_country.filter(pl.col("month").is_not_null()).group_by("month")
+
+    # Volumes per period
+    volumes_day = (
+        facts.filter(pl.col("day").is_not_null())
+        .group_by("day")
+        .agg(pl.len().cast(pl.Int64).alias("volume"))
+        .sort("day")
+    )
+    volumes_month = by_month.agg(pl.col("volume").sum().cast(pl.Int64)).sort("month")
+
+    ca_by_country = (
+        by_month_country.filter(pl.col("pays").is_not_null())
+        .group_by("pays")
+        .agg(pl.col("ca").sum().cast(pl.Float64))
+        .sort("pays")
+    )
 
     # Monthly revenue and growth
-    rev_month = joined.groupby("month")["montant"].sum().reset_index().rename(columns={"montant": "revenue"})
-    rev_month["revenue"] = rev_month["revenue"].astype(float)
-    rev_month = rev_month.sort_values("month")
-    rev_month["pct_change"] = rev_month["revenue"].pct_change().fillna(0)
+    rev_month = (
+        by_month.agg(pl.col("ca").sum().cast(pl.Float64).alias("revenue"))
+        .sort("month")
+        .with_columns(pl.col("revenue").pct_change().fill_null(0).alias("pct_change"))
+    )
+
+    # a single collect lets polars share the join / group_by work between the four tables
+    tables = pl.collect_all([volumes_day, volumes_month, ca_by_country, rev_month], engine="streaming")
 
     return {
-        "volumes_day": volumes_day,
-        "volumes_month": volumes_month,
-        "ca_by_country": ca_by_country,
-        "monthly_revenue": rev_month,
+        name: table.to_pandas()
+        for name, table in zip(["volumes_day", "volumes_month", "ca_by_country", "monthly_revenue"], tables)
     }
 
 
@@ -66,19 +105,19 @@ def gold_aggregation_flow():
     objs = list(client.list_objects(BUCKET_SILVER, recursive=True))
     names = [o.object_name for o in objs]
 
-    if "clients.csv" not in names or "achats.csv" not in names:
-        raise RuntimeError("Required silver objects clients.csv and achats.csv not found in silver bucket")
+    if "clients.parquet" not in names or "achats.parquet" not in names:
+        raise RuntimeError("Required silver objects clients.parquet and achats.parquet not found in silver bucket")
 
-    clients = read_csv_from_bucket(client, BUCKET_SILVER, "clients.csv")
-    achats = read_csv_from_bucket(client, BUCKET_SILVER, "achats.csv")
+    clients = read_frame_from_bucket(client, BUCKET_SILVER, "clients.parquet")
+    achats = read_frame_from_bucket(client, BUCKET_SILVER, "achats.parquet")
 
     kpis = compute_kpis(clients, achats)
 
     # Upload KPI results to BUCKET_GOLD
-    upload_df_to_bucket(client, kpis["volumes_day"], BUCKET_GOLD, "volumes_day.csv")
-    upload_df_to_bucket(client, kpis["volumes_month"], BUCKET_GOLD, "volumes_month.csv")
-    upload_df_to_bucket(client, kpis["ca_by_country"], BUCKET_GOLD, "ca_by_country.csv")
-    upload_df_to_bucket(client, kpis["monthly_revenue"], BUCKET_GOLD, "monthly_revenue.csv")
+    upload_df_to_bucket(client, kpis["volumes_day"], BUCKET_GOLD, "volumes_day.parquet")
+    upload_df_to_bucket(client, kpis["volumes_month"], BUCKET_GOLD, "volumes_month.parquet")
+    upload_df_to_bucket(client, kpis["ca_by_country"], BUCKET_GOLD, "ca_by_country.parquet")
+    upload_df_to_bucket(client, kpis["monthly_revenue"], BUCKET_GOLD, "monthly_revenue.parquet")
 
     print("Gold aggregations complete.")
 
@@ -0,0 +1,120 @@
+import pandas as pd
+from prefect import flow
+
+from .gold_to_mongo import MONGO_DB, MONGO_URI, ensure_metadata_index, write_df_to_mongo
+
+
+def _month_country_pipeline() -> list:
+    # keep only the fields we need before the $lookup so less data flows through the join;
+    # any future $match filter belongs at the very start, ahead of the $lookup
+    return [
+        {"$project": {
+            "_id": 0,
+            "id_client": 1,
+            "montant": 1,
+            "month": {"$dateToString": {"format": "%Y-%m", "date": {"$toDate": "$date_achat"}}},
+        }},
+        # at most one client per id_client (like the polars path's unique(keep="first")), so duplicated
+        # client rows cannot multiply the purchases; needs MongoDB >= 5.0 (localField + pipeline)
+        {"$lookup": {
+            "from": "clients",
+            "localField": "id_client",
+            "foreignField": "id_client",
+            "pipeline": [{"$limit": 1}, {"$project": {"_id": 0, "pays": 1}}],
+            "as": "c",
+        }},
+        {"$unwind": {"path": "$c", "preserveNullAndEmptyArrays": True}},
+        {"$group": {
+            "_id": {"month": "$month", "pays": "$c.pays"},
+            "ca": {"$sum": "$montant"},
+            "n": {"$sum": 1},
+        }},
+        # marginals are derived from the small (month, pays) result, still on the server
+        {"$facet": {
+            "volumes_month": [
+                {"$match": {"_id.month": {"$ne": None}}},
+                {"$group": {"_id": "$_id.month", "volume": {"$sum": "$n"}}},
+                {"$sort": {"_id": 1}},
+                {"$project": {"_id": 0, "month": "$_id", "volume": 1}},
+            ],
+            "ca_by_country": [
+                {"$match": {"_id.pays": {"$ne": None}}},
+                {"$group": {"_id": "$_id.pays", "ca": {"$sum": "$ca"}}},
+                {"$sort": {"_id": 1}},
+                {"$project": {"_id": 0, "pays": "$_id", "ca": 1}},
+            ],
+            "monthly_revenue": [
+                {"$match": {"_id.month": {"$ne": None}}},
+                {"$group": {"_id": "$_id.month", "revenue": {"$sum": "$ca"}}},
+                {"$sort": {"_id": 1}},
+                {"$project": {"_id": 0, "month": "$_id", "revenue": 1}},
+            ],
+        }},
+    ]
+
+
+def _volumes_day_pipeline() -> list:
+    return [
+        {"$match": {"date_achat": {"$ne": None}}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": {"$toDate": "$date_achat"}}},
+            "volume": {"$sum": 1},
+        }},
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, "day": "$_id", "volume": 1}},
+    ]
+
+
+def compute_kpis_in_mongo(db) -> dict:
+    """Compute the gold KPI tables with aggregation pipelines on the `achats` / `clients` collections."""
+    facets = next(db["achats"].aggregate(_month_country_pipeline(), allowDiskUse=True))
+    volumes_day = list(db["achats"].aggregate(_volumes_day_pipeline(), allowDiskUse=True))
+
+    rev_month = pd.DataFrame(facets["monthly_revenue"], columns=["month", "revenue"])
+    rev_month["revenue"] = rev_month["revenue"].astype(float)
+    rev_month["pct_change"] = rev_month["revenue"].pct_change().fillna(0)
+
+    return {
+        "volumes_day": pd.DataFrame(volumes_day, columns=["day", "volume"]),
+        "volumes_month": pd.DataFrame(facets["volumes_month"], columns=["month", "volume"]),
+        "ca_by_country": pd.DataFrame(facets["ca_by_country"], columns=["pays", "ca"]),
+        "monthly_revenue": rev_month,
+    }
+
+
+@flow(name="Gold Aggregation Mongo Flow")
+def gold_aggregation_mongo_flow():
+    """Refresh the KPI collections directly from `achats` / `clients` already stored in MongoDB.
+
+    The regular pipeline only loads the gold KPI tables into MongoDB; `achats` and `clients`
+    have to be loaded there separately before this flow can run.
+    """
+    from pymongo import MongoClient
+
+    client = MongoClient(MONGO_URI)
+    try:
+        db = client[MONGO_DB]
+
+        names = db.list_collection_names()
+        if "clients" not in names or "achats" not in names:
+            raise RuntimeError(
+                "Required collections clients and achats not found in MongoDB "
+                "(they are not written by the gold_to_mongo flow and must be loaded separately)"
+            )
+
+        ensure_metadata_index(db)
+        # the $lookup sub-pipeline rules out the hash join: without this index every purchase scans clients
+        db["clients"].create_index("id_client")
+        kpis = compute_kpis_in_mongo(db)
+    finally:
+        client.close()
+
+    for collection, df in kpis.items():
+        write_df_to_mongo(df, collection, {"object_name": f"mongo:{MONGO_DB}.achats", "last_modified": None})
+        print(f"Wrote {len(df)} records to MongoDB collection '{collection}'")
+
+    print("Gold aggregations (MongoDB) complete.")
+
+
+if __name__ == "__main__":
+    gold_aggregation_mongo_flow()
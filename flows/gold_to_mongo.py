@@ -4,33 +4,48 @@ from datetime import datetime, timezone
 from typing import Dict
 
 import pandas as pd
+import pyarrow as pa
 from prefect import flow, task
+from pymongoarrow.api import write as write_arrow
 
 from .config import BUCKET_GOLD, get_minio_client
 
 MONGO_URI = os.getenv("MONGO_URI") or os.getenv("MONGODB_URI") or "mongodb://localhost:27017"
 MONGO_DB = os.getenv("MONGO_DB") or os.getenv("MONGODB_DB") or "analytics"
+# dimensions the API is commonly filtered on; indexed whenever a collection has them
+INDEXED_FIELDS = ("pays", "month", "id_client")
+
+_CLIENT = None
+
+
+def _client():
+    """Module-wide MinIO client, so every task reuses the same urllib3 connection pool."""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = get_minio_client()
+    return _CLIENT
 
 
 @task(retries=1)
 def read_object_to_df(bucket: str, object_name: str) -> pd.DataFrame:
     """Read object from MinIO into a pandas DataFrame.
 
-    Note: the MinIO client is created inside the task to avoid passing
-    non-serializable objects as task inputs (prefect caching/hash warnings).
+    Note: the MinIO client is looked up inside the task rather than passed in,
+    to avoid non-serializable task inputs (prefect caching/hash warnings).
     """
-    client = get_minio_client()
+    client = _client()
     resp = client.get_object(bucket, object_name)
-    data = resp.read()
-    resp.close()
-    resp.release_conn()
-
-    # detect format
-    if object_name.lower().endswith(".parquet"):
-        return pd.read_parquet(BytesIO(data))
-    else:
-        # fallback to csv
-        return pd.read_csv(BytesIO(data))
+    try:
+        # detect format
+        if object_name.lower().endswith(".parquet"):
+            # parquet needs random access to its footer, so buffer the body
+            return pd.read_parquet(BytesIO(resp.read()))
+        else:
+            # fallback to csv, parsed straight from the response stream
+            return pd.read_csv(resp, engine="c")
+    finally:
+        resp.close()
+        resp.release_conn()
 
 
 @task(retries=1)
@@ -40,11 +55,17 @@ def write_df_to_mongo(df: pd.DataFrame, collection_name: str, metadata: Dict) ->
     client = MongoClient(MONGO_URI)
     db = client[MONGO_DB]
 
-    # drop existing and insert fresh
+    # load into a staging collection then swap it in, so readers never see an empty collection
     if not df.empty:
-        records = df.replace({pd.NaT: None}).to_dict(orient="records")
-        db[collection_name].delete_many({})
-        db[collection_name].insert_many(records)
+        stage = db[f"{collection_name}__stage"]
+        stage.drop()
+        # Arrow -> BSON encoding in C, no per-row python dicts; missing values become nulls
+        write_arrow(stage, pa.Table.from_pandas(df, preserve_index=False))
+        # build indexes before the swap so the live collection is never unindexed
+        for field in INDEXED_FIELDS:
+            if field in df.columns:
+                stage.create_index(field)
+        stage.rename(collection_name, dropTarget=True)
     else:
         db[collection_name].delete_many({})
 
@@ -60,19 +81,38 @@ def write_df_to_mongo(df: pd.DataFrame, collection_name: str, metadata: Dict) ->
     db["ingest_metadata"].update_one({"collection": collection_name}, {"$set": meta}, upsert=True)
 
 
+def ensure_metadata_index(db=None) -> None:
+    """Unique index on `ingest_metadata.collection`, used by every metadata lookup and upsert.
+
+    Uses `db` when the caller already has a connection, otherwise opens (and closes) its own.
+    """
+    if db is not None:
+        db["ingest_metadata"].create_index("collection", unique=True)
+        return
+
+    from pymongo import MongoClient
+
+    with MongoClient(MONGO_URI) as client:
+        client[MONGO_DB]["ingest_metadata"].create_index("collection", unique=True)
+
+
 @flow(name="gold_to_mongo")
-def gold_to_mongo_flow():
-    client = get_minio_client()
+def gold_to_mongo_flow() -> list:
+    """Load every gold object into its MongoDB collection; returns the collections written."""
+    client = _client()
+    written = []
 
     # ensure there is a gold bucket
     if not client.bucket_exists(BUCKET_GOLD):
         print(f"Bucket {BUCKET_GOLD} not found, nothing to ingest.")
-        return
+        return written
 
     objs = list(client.list_objects(BUCKET_GOLD, recursive=True))
     if not objs:
         print("No objects found in gold bucket.")
-        return
+        return written
+
+    ensure_metadata_index()
 
     for obj in objs:
         name = obj.object_name
@@ -86,10 +126,13 @@ def gold_to_mongo_flow():
             }
             collection = os.path.splitext(name)[0]
             write_df_to_mongo(df, collection, metadata)
+            written.append(collection)
             print(f"Wrote {len(df)} records to MongoDB collection '{collection}'")
         except Exception as e:
             print(f"Failed to process {name}: {e}")
 
+    return written
+
 
 if __name__ == "__main__":
     gold_to_mongo_flow()
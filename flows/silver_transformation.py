@@ -1,7 +1,9 @@
 from io import BytesIO
+import os
 from pathlib import Path
 
 import pandas as pd
+from pandas.api.types import is_object_dtype, is_string_dtype
 
 from prefect import flow
 from .config import BUCKET_BRONZE, BUCKET_SILVER, get_minio_client
@@ -14,51 +16,58 @@ def transform_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     # Standardize column names
     df.columns = [c.strip() for c in df.columns]
 
-    # Parse any date-like columns
+    # Build every column conversion in one pass over the columns, then apply them together
+    ops = {}
     for col in df.columns:
-        if "date" in col.lower():
-            df[col] = pd.to_datetime(df[col], errors="coerce")
-
-    # Normalize numeric columns
-    for col in df.select_dtypes(include=["object"]).columns:
-        # try to coerce numeric-like columns (montant, id fields)
-        if col.lower() in ("montant", "id_achat", "id_client", "id_client"):
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    # Lowercase & strip string columns like emails / names
-    for col in df.select_dtypes(include=["object"]).columns:
-        if any(keyword in col.lower() for keyword in ["email", "nom", "produit", "pays"]):
-            df[col] = df[col].astype(str).str.strip()
-            if "email" in col.lower():
-                df[col] = df[col].str.lower()
-
-    # Remove duplicates
-    df = df.drop_duplicates()
-
-    # Final pass: remove rows with critical missing ids
-    if "id_client" in df.columns:
-        df = df[df["id_client"].notna()]
-    if "id_achat" in df.columns:
-        df = df[df["id_achat"].notna()]
+        name = col.lower()
+        series = df[col]
+        is_text = is_object_dtype(series) or is_string_dtype(series)
+        if "date" in name:
+            # Parse any date-like columns
+            ops[col] = pd.to_datetime(series, errors="coerce")
+        elif name in ("montant", "id_achat", "id_client"):
+            # Normalize numeric-like columns (montant, id fields)
+            if is_text:
+                ops[col] = pd.to_numeric(series, errors="coerce")
+        elif is_text and any(keyword in name for keyword in ["email", "nom", "produit", "pays"]):
+            # Strip string columns like emails / names (string dtypes need no str copy first)
+            cleaned = (series.astype(str) if is_object_dtype(series) else series).str.strip()
+            if "email" in name:
+                cleaned = cleaned.str.lower()
+            ops[col] = cleaned
+    df = df.assign(**ops)
+
+    # Remove rows with critical missing ids, then duplicates: on the record key when
+    # there is one (id_achat for achats, id_client for clients), on every column otherwise
+    ids = [c for c in ("id_achat", "id_client") if c in df.columns]
+    if ids:
+        df = df.dropna(subset=ids)
+        df = df.drop_duplicates(subset=ids[:1], ignore_index=True)
+    else:
+        df = df.drop_duplicates(ignore_index=True)
 
     return df
 
 
 def process_object(client, bucket_from: str, object_name: str, bucket_to: str) -> None:
     resp = client.get_object(bucket_from, object_name)
-    data = resp.read()
-    resp.close()
-    resp.release_conn()
+    try:
+        # parse straight from the response stream instead of buffering the whole body
+        df = pd.read_csv(resp, engine="c")
+    finally:
+        resp.close()
+        resp.release_conn()
 
-    df = pd.read_csv(BytesIO(data))
     df_clean = transform_dataframe(df)
 
+    # silver is stored as parquet: typed columns and much smaller objects than csv
     out = BytesIO()
-    df_clean.to_csv(out, index=False)
+    df_clean.to_parquet(out, engine="pyarrow", compression="zstd", index=False)
     out.seek(0)
 
-    client.put_object(bucket_to, object_name, out, length=out.getbuffer().nbytes)
-    print(f"Transformed and uploaded {object_name} to {bucket_to}")
+    out_name = os.path.splitext(object_name)[0] + ".parquet"
+    client.put_object(bucket_to, out_name, out, length=out.getbuffer().nbytes)
+    print(f"Transformed and uploaded {out_name} to {bucket_to}")
 
 
 @flow(name="Silver Transformation Flow")
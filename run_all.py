@@ -14,15 +14,29 @@ and that `.env` (with `MONGODB_URI` / `API_URL`) exists in repo root if needed.
 """
 import os
 import sys
+import json
+import signal
 import time
+import asyncio
+import selectors
+import importlib
+import importlib.util
 import subprocess
 import argparse
+import threading
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
 
 import httpx
 from dotenv import load_dotenv
 
 
+@lru_cache(maxsize=1024)
+def _fmt(secs: int) -> str:
+    return str(timedelta(seconds=secs))
+
+
 def human_seconds(seconds: float) -> str:
     if seconds is None:
         return "N/A"
@@ -30,74 +44,279 @@ def human_seconds(seconds: float) -> str:
         secs = int(round(seconds))
     except Exception:
         return str(seconds)
-    return str(timedelta(seconds=secs))
+    return _fmt(secs)
+
 
+# One pooled client for every call to the API (health probes, collections, metadata)
+_HTTP = httpx.Client(
+    timeout=10.0,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+)
 
-def api_up(api_url: str) -> bool:
+
+def api_up(api_url: str, client: httpx.Client = _HTTP) -> bool:
     try:
-        with httpx.Client(timeout=2) as client:
-            r = client.get(f"{api_url}/health")
-            return r.status_code == 200
+        r = client.get(f"{api_url}/health", timeout=2)
+        return r.status_code == 200
     except Exception:
         return False
 
 
+UVICORN_LOG = "uvicorn.run_all.log"
+PROBE_INTERVAL = 0.05
+
+
 def start_uvicorn(python_exe: str, api_module: str = "app.api:app", host: str = "0.0.0.0", port: int = 8000):
-    log = open("uvicorn.run_all.log", "a")
-    cmd = [python_exe, "-m", "uvicorn", api_module, "--host", host, "--port", str(port)]
-    print(f"Starting uvicorn: {' '.join(cmd)} (logs -> uvicorn.run_all.log)")
-    proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, env=os.environ)
+    log = open(UVICORN_LOG, "a")
+    cmd = [python_exe, "-m", "uvicorn", api_module, "--host", host, "--port", str(port), "--no-access-log"]
+    # prefer uvloop + httptools when installed; python_exe is this interpreter so find_spec is enough
+    if importlib.util.find_spec("uvloop"):
+        cmd += ["--loop", "uvloop"]
+    if importlib.util.find_spec("httptools"):
+        cmd += ["--http", "httptools"]
+    print(f"Starting uvicorn: {' '.join(cmd)} (logs -> {UVICORN_LOG})")
+    # no preexec_fn so _posixsubprocess can vfork instead of fork (no page-table copy of this process);
+    # a new session keeps uvicorn out of our process group so a Ctrl-C here does not reach it mid-request
+    proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, env=os.environ, start_new_session=True)
     return proc
 
 
-def wait_for_api(api_url: str, timeout: int = 30):
+def stop_uvicorn(proc: subprocess.Popen, timeout: float = 10.0):
+    """SIGTERM the uvicorn session started by `start_uvicorn` (server and any workers) and wait for it."""
+    # only signal a child we have not reaped yet: a reaped pid may already belong to another process
+    if proc.poll() is not None:
+        return
+    pgid = proc.pid  # start_new_session makes uvicorn its own process group leader
+    try:
+        os.killpg(pgid, signal.SIGTERM)
+        proc.wait(timeout=timeout)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        print(f"uvicorn did not stop within {timeout:g}s, killing it")
+        os.killpg(pgid, signal.SIGKILL)
+        proc.wait()
+
+
+def log_tail(path: str, lines: int = 20) -> str:
+    try:
+        with open(path, errors="replace") as f:
+            return "".join(f.readlines()[-lines:])
+    except OSError:
+        return ""
+
+
+def wait_for_api(api_url: str, timeout: int = 30, server_proc=None, client: httpx.Client = _HTTP):
+    """Probe the API every PROBE_INTERVAL seconds until it answers.
+
+    When `server_proc` is given, its exit is watched through a pidfd (Linux) so a crashing
+    uvicorn aborts the wait immediately instead of after `timeout`.
+    """
     print(f"Waiting for API {api_url} to become ready (timeout {timeout}s)...")
-    start = time.time()
-    while time.time() - start < timeout:
-        if api_up(api_url):
-            print("API is up")
-            return True
-        time.sleep(1)
+    sel = selectors.DefaultSelector()
+    pidfd = None
+    if server_proc is not None and hasattr(os, "pidfd_open"):
+        try:
+            pidfd = os.pidfd_open(server_proc.pid)
+            sel.register(pidfd, selectors.EVENT_READ)
+        except OSError:
+            pidfd = None
+
+    try:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if api_up(api_url, client):
+                print("API is up")
+                return True
+            if pidfd is not None:
+                # the pidfd becomes readable as soon as the process exits
+                exited = bool(sel.select(timeout=PROBE_INTERVAL))
+            else:
+                time.sleep(PROBE_INTERVAL)
+                exited = server_proc is not None and server_proc.poll() is not None
+            if exited:
+                code = server_proc.wait()
+                print(f"uvicorn exited with code {code} before the API came up. Last log lines:")
+                print(log_tail(UVICORN_LOG))
+                return False
+    finally:
+        sel.close()
+        if pidfd is not None:
+            os.close(pidfd)
+
     print("Timed out waiting for API")
     return False
 
 
-def run_flow(python_exe: str):
-    cmd = [python_exe, "-m", "flows.gold_to_mongo"]
+FLOW_MODULE = "flows.gold_to_mongo"
+
+
+def preload_flow_module() -> threading.Thread:
+    """Import the flow module (pandas, pymongo, prefect...) in the background while uvicorn boots."""
+    def _preload():
+        try:
+            importlib.import_module(FLOW_MODULE)
+        except ImportError:
+            pass  # run_flow reports it and falls back to the subprocess
+
+    thread = threading.Thread(target=_preload, name="flow-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def run_flow(python_exe: str, isolate: bool = False):
+    """Run the Gold -> MongoDB flow in this interpreter, or in a child one when `isolate` is set.
+
+    The in-process call avoids a second interpreter start and re-importing pandas/pymongo;
+    if the module cannot be imported here we fall back to the subprocess.
+    Returns the collections the flow wrote, or None when it ran in a subprocess.
+    """
+    if not isolate:
+        try:
+            mod = importlib.import_module(FLOW_MODULE)
+        except ImportError as e:
+            print(f"Could not import {FLOW_MODULE} ({e}), running it in a subprocess")
+        else:
+            print(f"Running flow in-process: {FLOW_MODULE}.gold_to_mongo_flow()")
+            try:
+                return mod.gold_to_mongo_flow()
+            except SystemExit as e:
+                if e.code:
+                    raise RuntimeError(f"flow exited with status {e.code}") from e
+            return None
+
+    cmd = [python_exe, "-m", FLOW_MODULE]
     print(f"Running flow: {' '.join(cmd)}")
     subprocess.run(cmd, check=True)
 
 
-def fetch_and_print_metadata(api_url: str):
+METADATA_CACHE = Path.home() / ".cache" / "pipeline-elt-iim" / "metadata_cache.json"
+
+
+def load_metadata_cache() -> dict:
+    """Return the `{url: {"etag", "body"}}` map saved by the previous run (empty if missing or unreadable)."""
+    try:
+        return json.loads(METADATA_CACHE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_metadata_cache(cache: dict):
+    try:
+        METADATA_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        METADATA_CACHE.write_text(json.dumps(cache))
+    except OSError:
+        pass
+
+
+def with_fresh_age(meta: dict) -> dict:
+    """Recompute ingest->now for a cached metadata body (the only field that moves between ingests)."""
+    try:
+        ing = datetime.fromisoformat(meta["ingest_time"])
+    except (KeyError, TypeError, ValueError):
+        return meta
+    if ing.tzinfo is None:
+        ing = ing.replace(tzinfo=timezone.utc)
+    return {**meta, "delta_ingest_to_now_seconds": (datetime.now(timezone.utc) - ing).total_seconds()}
+
+
+async def fetch_metadata(api_url: str, cols: list, etags: dict = None) -> list:
+    """Request `/metadata/{c}` for every collection concurrently (responses or exceptions, in order).
+
+    `etags` maps a metadata URL to the ETag seen last time; it is sent as `If-None-Match`.
+    """
+    etags = etags or {}
+
+    def get(client, url):
+        headers = {"If-None-Match": etags[url]} if url in etags else None
+        return client.get(url, headers=headers)
+
+    urls = [f"{api_url}/metadata/{c}" for c in cols]
+    async with httpx.AsyncClient(timeout=10.0, limits=httpx.Limits(max_connections=50)) as client:
+        return await asyncio.gather(*(get(client, u) for u in urls), return_exceptions=True)
+
+
+def wait_for_metadata(
+    api_url: str, since: datetime, collections: list = None, timeout: float = 2.0, client: httpx.Client = _HTTP
+) -> bool:
+    """Poll metadata until one of `collections` reports an ingest_time at or after `since` (at most `timeout` s).
+
+    Without `collections` (flow ran in a subprocess) every collection listed by the API is probed.
+    Requests send `Cache-Control: no-cache` so the API re-reads (and re-caches) `ingest_metadata`
+    instead of serving its TTL cache.
+    """
+    cols = collections
+    if not cols:
+        try:
+            cols = [c for c in client.get(f"{api_url}/collections").json() if c != "ingest_metadata"]
+        except (httpx.HTTPError, ValueError):
+            return False
+    if not cols:
+        return False
+
+    def fresh(c):
+        try:
+            r = client.get(f"{api_url}/metadata/{c}", headers={"Cache-Control": "no-cache"})
+            if r.status_code != 200:
+                return False
+            ing = datetime.fromisoformat(r.json()["ingest_time"])
+        except (httpx.HTTPError, KeyError, TypeError, ValueError):
+            return False
+        if ing.tzinfo is None:
+            ing = ing.replace(tzinfo=timezone.utc)
+        return ing >= since
+
+    deadline = time.monotonic() + timeout
+    while True:
+        # probe every collection (no short-circuit) so each one's API cache entry is refreshed
+        if any([fresh(c) for c in cols]):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(PROBE_INTERVAL)
+
+
+def fetch_and_print_metadata(api_url: str, client: httpx.Client = _HTTP):
     print("Fetching collections from API...")
-    with httpx.Client(timeout=10) as client:
-        r = client.get(f"{api_url}/collections")
-        r.raise_for_status()
-        cols = r.json()
+    r = client.get(f"{api_url}/collections")
+    r.raise_for_status()
+    cols = r.json()
 
-        print(f"Found collections: {cols}")
+    print(f"Found collections: {cols}")
 
-        for c in cols:
-            # skip internal
-            if c == "ingest_metadata":
+    # skip internal
+    cols = [c for c in cols if c != "ingest_metadata"]
+    cache = load_metadata_cache()
+    etags = {url: entry["etag"] for url, entry in cache.items() if entry.get("etag")}
+    responses = asyncio.run(fetch_metadata(api_url, cols, etags))
+
+    for c, mr in zip(cols, responses):
+        url = f"{api_url}/metadata/{c}"
+        try:
+            if isinstance(mr, Exception):
+                raise mr
+            if mr.status_code == 304 and url in cache:
+                meta = with_fresh_age(cache[url]["body"])
+            elif mr.status_code != 200:
+                print(f"- {c}: metadata not found (status {mr.status_code})")
                 continue
-            try:
-                mr = client.get(f"{api_url}/metadata/{c}")
-                if mr.status_code != 200:
-                    print(f"- {c}: metadata not found (status {mr.status_code})")
-                    continue
+            else:
                 meta = mr.json()
-                src = meta.get("source_last_modified")
-                ing = meta.get("ingest_time")
-                ds = meta.get("delta_source_to_ingest_seconds")
-                di = meta.get("delta_ingest_to_now_seconds")
-                print(f"\nCollection: {c}")
-                print(f"  source_last_modified: {src}")
-                print(f"  ingest_time:          {ing}")
-                print(f"  source->ingest:       {human_seconds(ds)} ({ds} s)")
-                print(f"  ingest->now:          {human_seconds(di)} ({di} s)")
-            except Exception as e:
-                print(f"- error fetching metadata for {c}: {e}")
+                if mr.headers.get("ETag"):
+                    cache[url] = {"etag": mr.headers["ETag"], "body": meta}
+            src = meta.get("source_last_modified")
+            ing = meta.get("ingest_time")
+            ds = meta.get("delta_source_to_ingest_seconds")
+            di = meta.get("delta_ingest_to_now_seconds")
+            print(f"\nCollection: {c}")
+            print(f"  source_last_modified: {src}")
+            print(f"  ingest_time:          {ing}")
+            print(f"  source->ingest:       {human_seconds(ds)} ({ds} s)")
+            print(f"  ingest->now:          {human_seconds(di)} ({di} s)")
+        except Exception as e:
+            print(f"- error fetching metadata for {c}: {e}")
+
+    save_metadata_cache(cache)
 
 
 def main():
@@ -107,57 +326,62 @@ def main():
     python_exe = sys.executable
 
     server_proc = None
+    preload = None
     parser = argparse.ArgumentParser(description="Run API + pipeline and show timings")
     parser.add_argument("--keep-server", action="store_true", help="Don't stop uvicorn started by this script")
     parser.add_argument("--timeout", type=int, default=30, help="Timeout waiting for API (seconds)")
+    parser.add_argument("--isolate", action="store_true", help="Run the flow in a separate Python process")
     args = parser.parse_args()
 
     api_started_by_script = False
-    api_start_time = None
-
-    if api_up(api_url):
-        print(f"API already running at {api_url}, will reuse it.")
-        # consider the 'launch' time as now when reusing a running API
-        api_start_time = datetime.now(timezone.utc)
-    else:
-        server_proc = start_uvicorn(python_exe)
-        api_started_by_script = True
-        ok = wait_for_api(api_url, timeout=args.timeout)
-        if not ok:
-            print("API did not start. Exiting.")
-            if server_proc:
-                server_proc.terminate()
+    try:
+        api_start_time = None
+
+        if api_up(api_url):
+            print(f"API already running at {api_url}, will reuse it.")
+            # consider the 'launch' time as now when reusing a running API
+            api_start_time = datetime.now(timezone.utc)
+        else:
+            server_proc = start_uvicorn(python_exe)
+            api_started_by_script = True
+            if not args.isolate:
+                preload = preload_flow_module()
+            ok = wait_for_api(api_url, timeout=args.timeout, server_proc=server_proc)
+            if not ok:
+                print("API did not start. Exiting.")
+                sys.exit(1)
+            api_start_time = datetime.now(timezone.utc)
+
+        if preload:
+            preload.join()
+        flow_start = datetime.now(timezone.utc)
+        try:
+            written = run_flow(python_exe, isolate=args.isolate)
+        except Exception as e:
+            print(f"Flow failed: {e}")
             sys.exit(1)
-        api_start_time = datetime.now(timezone.utc)
+        flow_end = datetime.now(timezone.utc)
 
-    flow_start = datetime.now(timezone.utc)
-    try:
-        run_flow(python_exe)
-    except subprocess.CalledProcessError as e:
-        print(f"Flow failed: {e}")
-        if api_started_by_script and server_proc:
-            server_proc.terminate()
-        sys.exit(1)
-    flow_end = datetime.now(timezone.utc)
-
-    # compute delta between API launch and flow end
-    if api_start_time:
-        delta = flow_end - api_start_time
-        print(f"\nTiming: API launch -> flow end = {delta} ({delta.total_seconds():.3f} s)")
-
-    # give API a short moment to reflect new metadata
-    time.sleep(1)
-    fetch_and_print_metadata(api_url)
-
-    # stop uvicorn if we started it and user did not request to keep it
-    if api_started_by_script and server_proc:
-        if args.keep_server:
+        # compute delta between API launch and flow end
+        if api_start_time:
+            delta = flow_end - api_start_time
+            print(f"\nTiming: API launch -> flow end = {delta} ({delta.total_seconds():.3f} s)")
+
+        # wait (briefly) until the API reports the metadata written by this run
+        wait_for_metadata(api_url, since=flow_start, collections=written)
+        fetch_and_print_metadata(api_url)
+
+        if api_started_by_script and args.keep_server:
             print("Left uvicorn running (requested by --keep-server).\n")
-        else:
-            print("Stopping uvicorn started by this script...\n")
-            server_proc.terminate()
 
-    print("All done.\n")
+        print("All done.\n")
+    finally:
+        # the only place uvicorn is stopped: it runs in its own session, so on an error exit or a
+        # Ctrl-C here nothing else would stop it
+        if api_started_by_script and not args.keep_server:
+            print("Stopping uvicorn started by this script...\n")
+            stop_uvicorn(server_proc)
+        _HTTP.close()
 
 
 if __name__ == "__main__":
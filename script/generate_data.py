@@ -1,13 +1,23 @@
-import csv
-import random
-from datetime import datetime, timedelta
 from pathlib import Path
 
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from faker import Faker
 
 fake = Faker()
 Faker.seed(42)
-random.seed(42)
+rng = np.random.default_rng(42)
+
+# Taille max des réservoirs de noms / emails Faker
+FAKER_POOL_SIZE = 500
+
+
+def _random_dates(n: int, min_days_ago: int, max_days_ago: int) -> np.ndarray:
+    """Draw `n` dates uniformly between `max_days_ago` and `min_days_ago` days before today."""
+    offsets = rng.integers(min_days_ago, max_days_ago, size=n, endpoint=True)
+    return np.datetime64("today", "D") - offsets.astype("timedelta64[D]")
+
 
 def generate_clients(n_clients: int, output_path:str) -> list[int]:
     """
@@ -21,32 +31,29 @@ def generate_clients(n_clients: int, output_path:str) -> list[int]:
         list[int]: List of clients IDs
     """
 
-    countries = ["France", "Germany",  "Spain", "Italy", "Belgium", "Netherland", "Switzerland", "UK", "Canada"]
+    countries = np.array(["France", "Germany",  "Spain", "Italy", "Belgium", "Netherland", "Switzerland", "UK", "Canada"])
 
-    clients = []
-    client_ids = []
+    client_ids = np.arange(1, n_clients + 1)
 
-    for i in range(1, n_clients + 1):
-        date_inscription = fake.date_between(start_date = "-3y", end_date="-1m")
-        clients.append({
-            "id_client": i,
-            "nom": fake.name(),
-            "email": fake.email(),
-            "date_inscription": date_inscription.strftime("%Y-%m-%d"),
-            "pays": random.choice(countries)
-        })
+    # Faker ne génère qu'un petit réservoir de noms / emails, ensuite tiré au hasard par ligne
+    pool_size = min(n_clients, FAKER_POOL_SIZE)
+    name_pool = np.array([fake.unique.name() for _ in range(pool_size)])
+    email_pool = np.array([fake.email() for _ in range(pool_size)])
 
-        client_ids.append(i)
+    # Toutes les colonnes sont tirées d'un coup
+    clients = pa.table({
+        "id_client": client_ids,
+        "nom": rng.choice(name_pool, size=n_clients),
+        "email": rng.choice(email_pool, size=n_clients),
+        "date_inscription": np.datetime_as_string(_random_dates(n_clients, 30, 3 * 365), unit="D"),
+        "pays": rng.choice(countries, size=n_clients),
+    })
 
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-
-    with open(output_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["id_client",  "nom", "email", "date_inscription", "pays"])
-        writer.writeheader()
-        writer.writerows(clients)
+    pacsv.write_csv(clients, output_path, write_options=pacsv.WriteOptions(include_header=True))
 
     print(f"Generated Clients: {n_clients} in file {output_path}")
-    return client_ids
+    return client_ids.tolist()
 
 def generate_achats(client_ids: list[int], avg_purchases_per_client: int, output_path: str) -> None:
     """
@@ -58,11 +65,6 @@ def generate_achats(client_ids: list[int], avg_purchases_per_client: int, output
         avg_purchases_per_client: Average number of purchases per client
         output_path: Path to save achats.csv,
     """
-    products = ["Laptop", "Phone", "Tablet", "Headphones", "Monitor",  "Keyboard", "Mouse", "Webcam", "Speaker", "Charger"]
-    
-    achats = []
-    id_achat = 1
-    
     # Prix moyens pour chaque produit (en euros)
     product_prices = {
         "Laptop": (800, 2500),
@@ -76,38 +78,32 @@ def generate_achats(client_ids: list[int], avg_purchases_per_client: int, output
         "Speaker": (50, 500),
         "Charger": (15, 100)
     }
-    
-    for client_id in client_ids:
-        # Générer un nombre variable d'achats par client (autour de la moyenne)
-        n_achats = max(1, int(random.gauss(avg_purchases_per_client, avg_purchases_per_client * 0.5)))
-        
-        for _ in range(n_achats):
-            produit = random.choice(products)
-            # Générer un montant aléatoire dans la plage de prix du produit
-            min_price, max_price = product_prices[produit]
-            montant = round(random.uniform(min_price, max_price), 2)
-            
-            # Générer une date d'achat aléatoire (depuis l'inscription jusqu'à aujourd'hui)
-            date_achat = fake.date_between(start_date="-3y", end_date="today")
-            
-            achats.append({
-                "id_achat": id_achat,
-                "id_client": client_id,
-                "date_achat": date_achat.strftime("%Y-%m-%d"),
-                "montant": montant,
-                "produit": produit
-            })
-            
-            id_achat += 1
-    
+    products = np.array(list(product_prices))
+    price_low = np.array([low for low, _ in product_prices.values()])
+    price_high = np.array([high for _, high in product_prices.values()])
+
+    # Générer un nombre variable d'achats par client (autour de la moyenne)
+    counts = np.maximum(
+        1, rng.normal(avg_purchases_per_client, avg_purchases_per_client * 0.5, size=len(client_ids)).astype(np.int64)
+    )
+    total = int(counts.sum())
+
+    # Un produit par achat, et un montant aléatoire dans la plage de prix du produit
+    product_idx = rng.integers(0, len(products), size=total)
+
+    achats = pa.table({
+        "id_achat": np.arange(1, total + 1),
+        "id_client": np.repeat(np.asarray(client_ids, dtype=np.int64), counts),
+        # date d'achat aléatoire sur les 3 dernières années
+        "date_achat": np.datetime_as_string(_random_dates(total, 0, 3 * 365), unit="D"),
+        "montant": np.round(rng.uniform(price_low[product_idx], price_high[product_idx]), 2),
+        "produit": products[product_idx],
+    })
+
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    
-    with open(output_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["id_achat", "id_client", "date_achat", "montant", "produit"])
-        writer.writeheader()
-        writer.writerows(achats)
-    
-    print(f"Generated {len(achats)} purchases in file {output_path}")
+    pacsv.write_csv(achats, output_path, write_options=pacsv.WriteOptions(include_header=True))
+
+    print(f"Generated {total} purchases in file {output_path}")
 
 
 if __name__ == "__main__":
@@ -122,4 +118,4 @@ if __name__ == "__main__":
         client_ids=client_ids,
         avg_purchases_per_client=5,
         output_path=str(output_dir / "achats.csv")
-    )
\ No newline at end of file
+    )
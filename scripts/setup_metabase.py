@@ -9,9 +9,10 @@ Reads env vars:
 Usage: set -a; [ -f .env ] && source .env; set +a; python3 scripts/setup_metabase.py
 """
 import os
+import json
 import time
 import httpx
-from urllib.parse import urljoin
+from pathlib import Path
 
 
 METABASE_URL = os.getenv("METABASE_URL", "http://localhost:3000")
@@ -20,111 +21,162 @@ ADMIN_PASSWORD = os.getenv("METABASE_ADMIN_PASSWORD", "change_me")
 MONGODB_URI = os.getenv("MONGODB_URI") or os.getenv("MONGO_URI")
 MONGODB_DB = os.getenv("MONGODB_DB") or os.getenv("MONGODB_DB") or os.getenv("MONGODB_DB") or os.getenv("MONGODB_DB")
 
+# Metabase endpoints, built once
+_BASE = METABASE_URL.rstrip("/")
+HEALTH_URL = _BASE + "/api/health"
+SETUP_URL = _BASE + "/api/setup"
+SESSION_URL = _BASE + "/api/session"
+DB_URL = _BASE + "/api/database"
+CURRENT_USER_URL = _BASE + "/api/user/current"
 
-def wait_for_metabase(timeout=120):
+
+# Metabase sessions last 14 days by default; reuse a cached one a bit less than that
+TOKEN_CACHE = Path.home() / ".cache" / "pipeline-elt-iim" / "metabase_session.json"
+TOKEN_MAX_AGE = 13 * 24 * 3600
+
+
+def _load_cached_token():
+    try:
+        data = json.loads(TOKEN_CACHE.read_text())
+    except (OSError, ValueError):
+        return None
+    # only valid for the same Metabase instance and admin user
+    if data.get("url") != METABASE_URL or data.get("email") != ADMIN_EMAIL:
+        return None
+    if time.time() - data.get("ts", 0) > TOKEN_MAX_AGE:
+        return None
+    return data.get("token")
+
+
+def _save_cached_token(token, ts):
+    if not token:
+        return
+    try:
+        TOKEN_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        # the session token grants admin access: create the file owner-only, never readable by others
+        fd = os.open(TOKEN_CACHE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            # an existing file keeps its old mode through O_CREAT, so tighten it before writing
+            os.fchmod(f.fileno(), 0o600)
+            f.write(json.dumps({"url": METABASE_URL, "email": ADMIN_EMAIL, "token": token, "ts": ts}))
+    except OSError:
+        pass
+
+
+def wait_for_metabase(session: httpx.Client, timeout=120):
     print(f"Waiting for Metabase at {METABASE_URL}...")
     start = time.time()
-    health = urljoin(METABASE_URL, "/api/health")
+    # probe quickly at first, backing off up to every 2s
+    delay = 0.1
     while time.time() - start < timeout:
         try:
-            r = httpx.get(health, timeout=5)
+            r = session.get(HEALTH_URL, timeout=2)
             if r.status_code == 200:
                 print("Metabase is up")
                 return True
-        except Exception:
+        except httpx.TransportError:
             pass
-        time.sleep(2)
+        time.sleep(delay)
+        delay = min(delay * 1.5, 2.0)
     print("Timed out waiting for Metabase")
     return False
 
 
-def setup_admin_and_db():
-    setup_url = urljoin(METABASE_URL, "/api/setup")
-    session_url = urljoin(METABASE_URL, "/api/session")
-    db_url = urljoin(METABASE_URL, "/api/database")
-
+def setup_admin_and_db(session: httpx.Client):
     print(f"Attempting Metabase actions against {METABASE_URL}")
     print(f"Using admin email: {ADMIN_EMAIL} (password hidden)")
 
-    # Try to login first
-    with httpx.Client() as client:
+    # Reuse a cached session token when Metabase still accepts it (skips the login round-trip)
+    token = _load_cached_token()
+    if token:
+        session.headers["X-Metabase-Session"] = token
         try:
-            r = client.post(session_url, json={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD}, timeout=10)
-            if r.status_code == 200:
-                print("Logged into Metabase as existing admin")
-                token = r.json().get("id")
-                session = client
-                session.headers.update({"X-Metabase-Session": token})
+            if session.get(CURRENT_USER_URL, timeout=10).status_code == 200:
+                print("Reusing cached Metabase session")
                 return session
         except Exception:
             pass
+        del session.headers["X-Metabase-Session"]
 
-        # If login failed, try setup
-        payload = {
-            "prefs": {},
-            "database": None,
-            "user": {
-                "first_name": "Admin",
-                "last_name": "User",
-                "email": ADMIN_EMAIL,
-                "password": ADMIN_PASSWORD
-            }
+    # Try to login first
+    try:
+        r = session.post(SESSION_URL, json={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD}, timeout=10)
+        if r.status_code == 200:
+            print("Logged into Metabase as existing admin")
+            token = r.json().get("id")
+            _save_cached_token(token, time.time())
+            session.headers.update({"X-Metabase-Session": token})
+            return session
+    except Exception:
+        pass
+
+    # If login failed, try setup
+    payload = {
+        "prefs": {},
+        "database": None,
+        "user": {
+            "first_name": "Admin",
+            "last_name": "User",
+            "email": ADMIN_EMAIL,
+            "password": ADMIN_PASSWORD
         }
+    }
 
-        try:
-            r = client.post(setup_url, json=payload, timeout=20)
-            if r.status_code in (200, 201):
-                print("Metabase initial setup completed (admin created)")
-                # login to get session
-                r2 = client.post(session_url, json={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD}, timeout=10)
-                if r2.status_code == 200:
-                    token = r2.json().get("id")
-                    client.headers.update({"X-Metabase-Session": token})
-                    return client
-                else:
-                    print("Setup succeeded but login failed")
-                    return None
+    try:
+        r = session.post(SETUP_URL, json=payload, timeout=20)
+        if r.status_code in (200, 201):
+            print("Metabase initial setup completed (admin created)")
+            # login to get session
+            r2 = session.post(SESSION_URL, json={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD}, timeout=10)
+            if r2.status_code == 200:
+                token = r2.json().get("id")
+                _save_cached_token(token, time.time())
+                session.headers.update({"X-Metabase-Session": token})
+                return session
             else:
-                print(f"Setup API returned status {r.status_code}, response: {r.text}")
-                # If setup API refuses because token missing or similar, inform user and poll for manual admin creation
-                try:
-                    body = r.json()
-                except Exception:
-                    body = {}
-                if r.status_code == 400 and ("Token does not match" in r.text or body.get("errors")):
-                    print("It looks like Metabase requires interactive setup (setup token) or is already configured.")
-                    print("Please open Metabase UI at", METABASE_URL, "and finish the initial setup (create admin user).")
-                    # Provide more specific guidance based on validation errors
-                    errs = body.get("errors") or {}
-                    if isinstance(errs, dict):
-                        if errs.get("user") and errs["user"].get("password"):
-                            print(" - Password rejected: choose a stronger, less common password in the UI setup.")
-                        if errs.get("prefs") and errs["prefs"].get("site_name"):
-                            print(" - Site name missing: provide a non-empty site name in the UI setup.")
-                        if errs.get("token"):
-                            print(" - Setup token mismatch: the setup must be completed interactively in the UI.")
-
-                    print("After completing the UI setup, set METABASE_ADMIN_EMAIL and METABASE_ADMIN_PASSWORD in your .env and re-run this script.")
-                    # Abort instead of polling to avoid rate-limiting / infinite loops
-                    return None
-        except Exception as e:
-            print(f"Error calling setup API: {e}")
-
-        # If setup failed because Metabase already configured, try to login again and proceed
-        try:
-            r = client.post(session_url, json={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD}, timeout=10)
-            if r.status_code == 200:
-                token = r.json().get("id")
-                client.headers.update({"X-Metabase-Session": token})
-                return client
-        except Exception:
-            pass
+                print("Setup succeeded but login failed")
+                return None
+        else:
+            print(f"Setup API returned status {r.status_code}, response: {r.text}")
+            # If setup API refuses because token missing or similar, inform user and poll for manual admin creation
+            try:
+                body = r.json()
+            except Exception:
+                body = {}
+            if r.status_code == 400 and ("Token does not match" in r.text or body.get("errors")):
+                print("It looks like Metabase requires interactive setup (setup token) or is already configured.")
+                print("Please open Metabase UI at", METABASE_URL, "and finish the initial setup (create admin user).")
+                # Provide more specific guidance based on validation errors
+                errs = body.get("errors") or {}
+                if isinstance(errs, dict):
+                    if errs.get("user") and errs["user"].get("password"):
+                        print(" - Password rejected: choose a stronger, less common password in the UI setup.")
+                    if errs.get("prefs") and errs["prefs"].get("site_name"):
+                        print(" - Site name missing: provide a non-empty site name in the UI setup.")
+                    if errs.get("token"):
+                        print(" - Setup token mismatch: the setup must be completed interactively in the UI.")
+
+                print("After completing the UI setup, set METABASE_ADMIN_EMAIL and METABASE_ADMIN_PASSWORD in your .env and re-run this script.")
+                # Abort instead of polling to avoid rate-limiting / infinite loops
+                return None
+    except Exception as e:
+        print(f"Error calling setup API: {e}")
+
+    # If setup failed because Metabase already configured, try to login again and proceed
+    try:
+        r = session.post(SESSION_URL, json={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD}, timeout=10)
+        if r.status_code == 200:
+            token = r.json().get("id")
+            _save_cached_token(token, time.time())
+            session.headers.update({"X-Metabase-Session": token})
+            return session
+    except Exception:
+        pass
 
     return None
 
 
 def add_mongo_datasource(session: httpx.Client):
-    db_url = urljoin(METABASE_URL, "/api/database")
     # Attempt to add using connection string in details — Metabase supports different shapes across versions.
     payload = {
         "name": "MongoDB Atlas",
@@ -134,7 +186,7 @@ def add_mongo_datasource(session: httpx.Client):
         }
     }
     try:
-        r = session.post(db_url, json=payload, timeout=20)
+        r = session.post(DB_URL, json=payload, timeout=20)
         if r.status_code in (200, 201):
             print("MongoDB datasource created in Metabase")
             return True
@@ -151,15 +203,16 @@ def main():
         print("MONGODB_URI not set — cannot configure Metabase datasource")
         return 1
 
-    if not wait_for_metabase(timeout=120):
-        return 2
+    # one keep-alive client for the health probes, login/setup and datasource calls
+    with httpx.Client(timeout=20, limits=httpx.Limits(max_keepalive_connections=10)) as session:
+        if not wait_for_metabase(session, timeout=120):
+            return 2
 
-    session = setup_admin_and_db()
-    if not session:
-        print("Could not obtain Metabase admin session — aborting")
-        return 3
+        if not setup_admin_and_db(session):
+            print("Could not obtain Metabase admin session — aborting")
+            return 3
 
-    ok = add_mongo_datasource(session)
+        ok = add_mongo_datasource(session)
     return 0 if ok else 4
 
 
@@ -1,23 +1,72 @@
+import asyncio
+
 import pytest
 from fastapi.testclient import TestClient
 
 import app.api as api_module
 
 
+def _done(value):
+    # an already-resolved future: awaitable like the driver's coroutines, without a coroutine frame
+    fut = asyncio.get_running_loop().create_future()
+    fut.set_result(value)
+    return fut
+
+
+class DummyCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def skip(self, n):
+        return self
+
+    def limit(self, n):
+        return self
+
+    async def _iter(self):
+        for d in self._docs:
+            yield d
+
+    def __aiter__(self):
+        return self._iter()
+
+
 class DummyDB:
-    def __init__(self, names=None):
+    def __init__(self, names=None, count=0):
         self._names = names or []
+        self._count = count
+        self.list_calls = 0
+        self.find_one_calls = 0
 
-    async def list_collection_names(self):
-        return self._names
+    def __getitem__(self, name):
+        return self
+
+    def list_collection_names(self):
+        self.list_calls += 1
+        return _done(self._names)
+
+    def find(self, query, projection=None):
+        self.last_projection = projection
+        return DummyCursor([{"day": "2024-01-01", "volume": 3}])
+
+    def count_documents(self, query):
+        return _done(0)
+
+    def estimated_document_count(self):
+        return _done(self._count)
 
-    async def count_documents(self, query):
-        return 0
+    def find_one(self, query):
+        self.find_one_calls += 1
+        return _done({
+            "collection": query["collection"],
+            "ingest_time": "2024-01-02T00:00:00+00:00",
+            "source_info": {"last_modified": "2024-01-01T00:00:00"},
+        })
 
 
 class DummyAdmin:
-    async def command(self, cmd):
-        return {"ok": 1}
+    def command(self, cmd):
+        return _done({"ok": 1})
 
 
 class DummyClient:
@@ -28,22 +77,102 @@ class DummyClient:
         return DummyDB()
 
 
+@pytest.fixture(scope="module")
+def client():
+    # the app reads api_module.db at request time, so one client serves every monkeypatched test
+    with TestClient(api_module.app) as c:
+        yield c
+
+
 @pytest.fixture(autouse=True)
 def patch_client(monkeypatch):
-    # Replace motor client with a dummy sync-able object for testing
+    # Replace the mongo client with a dummy sync-able object for testing
     monkeypatch.setattr(api_module, "client", DummyClient())
     monkeypatch.setattr(api_module, "db", DummyDB())
+    monkeypatch.setattr(api_module, "_collections_cache", (0.0, set()))
+    monkeypatch.setattr(api_module, "_metadata_cache", {})
 
 
-def test_health_endpoint():
-    client = TestClient(api_module.app)
+def test_health_endpoint(client):
     r = client.get("/health")
     assert r.status_code == 200
     assert r.json() == {"status": "ok"}
 
 
-def test_collections_empty():
-    client = TestClient(api_module.app)
+def test_collections_empty(client):
     r = client.get("/collections")
     assert r.status_code == 200
     assert isinstance(r.json(), list)
+
+
+def test_count_uses_cached_collection_names(client, monkeypatch):
+    db = DummyDB(names=["volumes_day"])
+    monkeypatch.setattr(api_module, "db", db)
+    for _ in range(3):
+        r = client.get("/collections/volumes_day/count")
+        assert r.status_code == 200
+    assert db.list_calls == 1
+
+
+def test_unknown_collection_refreshes_before_404(client, monkeypatch):
+    db = DummyDB(names=["volumes_day"])
+    monkeypatch.setattr(api_module, "db", db)
+    r = client.get("/collections/missing/count")
+    assert r.status_code == 404
+    assert db.list_calls == 2
+
+
+def test_collection_projects_requested_fields(client, monkeypatch):
+    db = DummyDB(names=["volumes_day"])
+    monkeypatch.setattr(api_module, "db", db)
+    r = client.get("/collections/volumes_day", params={"fields": "day,volume"})
+    assert r.status_code == 200
+    assert r.json() == [{"day": "2024-01-01", "volume": 3}]
+    assert db.last_projection == {"_id": 0, "day": 1, "volume": 1}
+
+
+def test_count_skips_existence_check_when_not_empty(client, monkeypatch):
+    db = DummyDB(names=["volumes_day"], count=42)
+    monkeypatch.setattr(api_module, "db", db)
+    r = client.get("/collections/volumes_day/count")
+    assert r.status_code == 200
+    assert r.json() == {"collection": "volumes_day", "count": 42}
+    assert db.list_calls == 0
+
+
+def test_metadata_is_cached_between_requests(client, monkeypatch):
+    db = DummyDB()
+    monkeypatch.setattr(api_module, "db", db)
+    for _ in range(2):
+        r = client.get("/metadata/volumes_day")
+        assert r.status_code == 200
+        body = r.json()
+        assert body["delta_source_to_ingest_seconds"] == 86400
+        assert body["delta_ingest_to_now_seconds"] > 0
+    assert db.find_one_calls == 1
+
+
+def test_metadata_etag_returns_not_modified(client):
+    r = client.get("/metadata/volumes_day")
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+    r = client.get("/metadata/volumes_day", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["ETag"] == etag
+
+
+def test_metadata_no_cache_bypasses_ttl(client, monkeypatch):
+    db = DummyDB()
+    monkeypatch.setattr(api_module, "db", db)
+    client.get("/metadata/volumes_day")
+    r = client.get("/metadata/volumes_day", headers={"Cache-Control": "no-cache"})
+    assert r.status_code == 200
+    assert db.find_one_calls == 2
+
+
+def test_staging_collections_are_not_served(client, monkeypatch):
+    db = DummyDB(names=["volumes_day", "volumes_day__stage"], count=5)
+    monkeypatch.setattr(api_module, "db", db)
+    assert client.get("/collections").json() == ["volumes_day"]
+    for path in ("", "/items", "/count"):
+        assert client.get(f"/collections/volumes_day__stage{path}").status_code == 404
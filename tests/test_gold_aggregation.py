@@ -0,0 +1,35 @@
+import polars as pl
+
+from flows.gold_aggregation import compute_kpis
+
+
+def test_compute_kpis_tables():
+    # client 1 is duplicated, the last purchase has no date
+    clients = pl.DataFrame({"id_client": [1, 1, 2], "pays": ["France", "France", "Spain"]})
+    achats = pl.DataFrame({
+        "id_client": [1, 2, 1, 2],
+        "date_achat": ["2024-01-05", "2024-01-20", "2024-02-03", None],
+        "montant": [10.0, 20.0, 60.0, 5.0],
+    })
+
+    kpis = compute_kpis(clients, achats)
+
+    assert kpis["volumes_day"].to_dict("records") == [
+        {"day": "2024-01-05", "volume": 1},
+        {"day": "2024-01-20", "volume": 1},
+        {"day": "2024-02-03", "volume": 1},
+    ]
+    # no "NaT" month row for the undated purchase
+    assert kpis["volumes_month"].to_dict("records") == [
+        {"month": "2024-01", "volume": 2},
+        {"month": "2024-02", "volume": 1},
+    ]
+    # the duplicated client does not double France's purchases; the undated one still counts for Spain
+    assert kpis["ca_by_country"].to_dict("records") == [
+        {"pays": "France", "ca": 70.0},
+        {"pays": "Spain", "ca": 25.0},
+    ]
+    assert kpis["monthly_revenue"].to_dict("records") == [
+        {"month": "2024-01", "revenue": 30.0, "pct_change": 0.0},
+        {"month": "2024-02", "revenue": 60.0, "pct_change": 1.0},
+    ]
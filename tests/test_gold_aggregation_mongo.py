@@ -0,0 +1,106 @@
+import pymongo
+import pytest
+
+import flows.gold_aggregation_mongo as agg_module
+
+
+class DummyCollection:
+    def __init__(self, results):
+        self._results = results
+        self.pipelines = []
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        self.pipelines.append(pipeline)
+        return iter(self._results.pop(0))
+
+
+class DummyDB:
+    def __init__(self, achats):
+        self._achats = achats
+
+    def __getitem__(self, name):
+        assert name == "achats"
+        return self._achats
+
+
+FACETS = {
+    "volumes_month": [{"month": "2024-01", "volume": 2}, {"month": "2024-02", "volume": 1}],
+    "ca_by_country": [{"pays": "France", "ca": 30.0}],
+    "monthly_revenue": [{"month": "2024-01", "revenue": 10}, {"month": "2024-02", "revenue": 20}],
+}
+
+
+def test_month_country_pipeline_joins_one_client_per_id():
+    pipeline = agg_module._month_country_pipeline()
+    assert [next(iter(stage)) for stage in pipeline] == ["$project", "$lookup", "$unwind", "$group", "$facet"]
+    lookup = pipeline[1]["$lookup"]
+    assert lookup["from"] == "clients"
+    assert {"$limit": 1} in lookup["pipeline"]
+    assert set(pipeline[-1]["$facet"]) == {"volumes_month", "ca_by_country", "monthly_revenue"}
+
+
+def test_compute_kpis_in_mongo_maps_results():
+    achats = DummyCollection([[FACETS], [{"day": "2024-01-01", "volume": 2}]])
+    kpis = agg_module.compute_kpis_in_mongo(DummyDB(achats))
+
+    assert len(achats.pipelines) == 2
+    assert list(kpis["volumes_day"].columns) == ["day", "volume"]
+    assert list(kpis["volumes_month"].columns) == ["month", "volume"]
+    assert kpis["ca_by_country"].to_dict("records") == [{"pays": "France", "ca": 30.0}]
+    assert kpis["monthly_revenue"]["pct_change"].tolist() == [0.0, 1.0]
+
+
+def test_flow_indexes_clients_before_aggregating(monkeypatch):
+    calls = []
+
+    class DummyColl:
+        def __init__(self, name):
+            self.name = name
+
+        def create_index(self, key, **kwargs):
+            calls.append((self.name, key))
+
+    class DummyClient:
+        def __init__(self, uri):
+            pass
+
+        def __getitem__(self, name):
+            # client[MONGO_DB] -> the client itself, doubling as the database
+            return self if name == agg_module.MONGO_DB else DummyColl(name)
+
+        def list_collection_names(self):
+            return ["achats", "clients"]
+
+        def close(self):
+            pass
+
+    def fake_compute(db):
+        calls.append("compute")
+        return {}
+
+    monkeypatch.setattr(pymongo, "MongoClient", DummyClient)
+    monkeypatch.setattr(agg_module, "compute_kpis_in_mongo", fake_compute)
+    agg_module.gold_aggregation_mongo_flow.fn()
+    assert calls == [("ingest_metadata", "collection"), ("clients", "id_client"), "compute"]
+
+
+def test_flow_closes_client_when_collections_missing(monkeypatch):
+    class DummyClient:
+        closed = False
+
+        def __init__(self, uri):
+            pass
+
+        def __getitem__(self, name):
+            return self
+
+        def list_collection_names(self):
+            return ["volumes_day"]
+
+        def close(self):
+            DummyClient.closed = True
+
+    monkeypatch.setattr(pymongo, "MongoClient", DummyClient)
+    with pytest.raises(RuntimeError):
+        agg_module.gold_aggregation_mongo_flow.fn()
+    assert DummyClient.closed
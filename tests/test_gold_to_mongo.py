@@ -0,0 +1,37 @@
+import mongomock
+import pandas as pd
+import pymongo
+
+import flows.gold_to_mongo as gtm_module
+
+
+def test_write_df_to_mongo_swaps_in_indexed_collection(monkeypatch):
+    mongo = mongomock.MongoClient()
+    tables = []
+
+    def fake_write_arrow(collection, table):
+        # mongomock has no custom type_registry support, so insert the Arrow rows directly
+        tables.append((collection.name, table))
+        collection.insert_many(table.to_pylist())
+
+    monkeypatch.setattr(pymongo, "MongoClient", lambda *a, **k: mongo)
+    monkeypatch.setattr(gtm_module, "write_arrow", fake_write_arrow)
+
+    df = pd.DataFrame({
+        "month": ["2024-01", None],
+        "pays": ["France", "Spain"],
+        "ca": [1.0, 2.0],
+        "day": [pd.Timestamp("2024-01-01"), pd.NaT],
+    })
+    gtm_module.write_df_to_mongo.fn(df, "kpi", {"object_name": "kpi.parquet", "last_modified": None})
+
+    name, table = tables[0]
+    assert name == "kpi__stage"
+    assert table.column("month").null_count == 1
+    assert table.column("day").null_count == 1
+
+    db = mongo[gtm_module.MONGO_DB]
+    assert "kpi__stage" not in db.list_collection_names()
+    assert list(db["kpi"].find({}, {"_id": 0}))[1]["month"] is None
+    assert {"month_1", "pays_1"} <= set(db["kpi"].index_information())
+    assert db["ingest_metadata"].find_one({"collection": "kpi"})["source_info"]["object_name"] == "kpi.parquet"